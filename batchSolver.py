@@ -0,0 +1,203 @@
+#! /usr/bin/env python3
+'''
+Batch Solver that solves many mazes of the same size at once.
+The mazes are stacked into a single 3-D wall array and a breadth first
+search expands the frontier of every maze in lockstep using numpy, so the
+per-maze Python overhead is paid once per batch instead of once per maze.
+@author: Paul Miller (github.com/138paulmiller)
+'''
+import numpy as np
+
+# wall array bits, set if there is a portal from a cell to its neighbor
+OPEN_RIGHT = 1	# portal between (x, y) and (x+1, y)
+OPEN_DOWN = 2	# portal between (x, y) and (x, y+1)
+
+def walls(mazes):
+	'''
+	Stacks the portals of the mazes into a wall array.
+	@params
+		mazes([Maze])	: mazes which must all share the same width and height
+	@return
+		ndarray	: uint8 array of shape (N, height, width) of OPEN_* bits
+	'''
+	width = mazes[0].width
+	height = mazes[0].height
+	for maze_obj in mazes:
+		assert maze_obj.width == width and maze_obj.height == height
+	# every maze has width*height-1 edges, so they stack into (N, E, 2)
+	edges = np.frombuffer(b''.join([maze_obj.edge_array.tobytes() for maze_obj in mazes]), 
+		dtype=np.uint32).reshape(len(mazes), -1, 2)
+	index = np.broadcast_to(np.arange(len(mazes))[:, None], edges.shape[:2])
+	# edges are (a, b) with a < b, so b is either right of or below a
+	down = edges[:, :, 1] - edges[:, :, 0] == width
+	right = ~down
+	stack = np.zeros((len(mazes), height*width), dtype=np.uint8)
+	# a cell has at most one portal each way, so no index repeats
+	stack[index[right], edges[:, :, 0][right]] = OPEN_RIGHT
+	stack[index[down], edges[:, :, 0][down]] |= OPEN_DOWN
+	return stack.reshape(len(mazes), height, width)
+
+def pack_rows(cells):
+	'''
+	Packs each row of a boolean (N, height, width) array into 64 bit words
+	so one numpy operation handles 64 cells.
+	@params
+		cells(ndarray)	: boolean array of shape (N, height, width)
+	@return
+		ndarray	: uint64 array of shape (N, height, words), bit x%64 of 
+				  word x//64 is cell x of the row
+	'''
+	count, height, width = cells.shape
+	words = (width + 63) // 64
+	padded = np.zeros((count, height, words*64), dtype=bool)
+	padded[:, :, :width] = cells
+	packed = np.packbits(padded, axis=-1, bitorder='little')
+	return packed.view('<u8').astype(np.uint64)
+
+def set_distance(dist, live, rows, step):
+	'''
+	Sets the distance of every cell set in the packed rows, the frontier
+	only holds a few cells per maze so only nonzero words are visited
+	'''
+	index, y, word = np.nonzero(rows)
+	bits = rows[index, y, word]
+	one = np.uint64(1)
+	while len(bits) > 0:
+		# isolate the lowest set bit, its log2 is exact since it is a power of 2
+		low = bits & (~bits + one)
+		x = word*64 + np.log2(low).astype(np.intp)
+		dist[live[index], y, x] = step
+		bits ^= low
+		left = bits != 0
+		index, y, word, bits = index[left], y[left], word[left], bits[left]
+
+def distances(wall_array, with_dist=True):
+	'''
+	Breadth first search from the start (0,0) of every maze at once.
+	Rows are packed into bit masks and mazes are dropped from the search
+	once their end is reached.
+	@params
+		wall_array(ndarray)	: (N, height, width) array returned by walls
+		with_dist(bool)	: also return the distance to each cell
+	@return
+		ndarray	: number of moves from start to end of each maze, -1 if unsolvable
+		ndarray	: int32 array of shape (N, height, width), number of moves
+				  from the start to each cell no further than the end, -1 
+				  otherwise. Only if with_dist is True
+	'''
+	count, height, width = wall_array.shape
+	lengths = np.full(count, -1, dtype=np.int32)
+	dist = np.full(wall_array.shape, -1, dtype=np.int32) if with_dist else None
+	if with_dist:
+		dist[:, 0, 0] = 0
+	# mazes still being searched, the working arrays only hold these
+	live = np.arange(count)
+	right = pack_rows((wall_array & OPEN_RIGHT) != 0)
+	down = pack_rows((wall_array & OPEN_DOWN) != 0)
+	frontier = np.zeros(right.shape, dtype=np.uint64)
+	frontier[:, 0, 0] = 1
+	seen = frontier.copy()
+	# bit of the end cell in the last row
+	end_word = (width-1) // 64
+	end_bit = np.uint64(1 << ((width-1) % 64))
+	one = np.uint64(1)
+	carry = np.uint64(63)
+	# reused every step instead of allocating new arrays
+	expand = np.empty_like(frontier)
+	moved = np.empty_like(frontier)
+	step = 0
+	while len(live) > 0:
+		end = ((frontier[:, -1, end_word] & end_bit) != 0) & (lengths[live] < 0)
+		lengths[live[end]] = step
+		searching = lengths[live] < 0
+		# compact the working set once a quarter of it is solved
+		if not searching.all() and searching.sum()*4 <= len(live)*3:
+			live = live[searching]
+			right = right[searching]
+			down = down[searching]
+			frontier = frontier[searching]
+			seen = seen[searching]
+			expand = np.empty_like(frontier)
+			moved = np.empty_like(frontier)
+			if len(live) == 0:
+				break
+		step += 1
+		# move right, cell x reaches x+1, carrying the top bit into the next word
+		np.bitwise_and(frontier, right, out=moved)
+		np.left_shift(moved, one, out=expand)
+		expand[:, :, 1:] |= moved[:, :, :-1] >> carry
+		# move left, cell x+1 reaches x
+		np.right_shift(frontier, one, out=moved)
+		moved[:, :, :-1] |= frontier[:, :, 1:] << carry
+		moved &= right
+		expand |= moved
+		# move down and up through the rows
+		np.bitwise_and(frontier[:, :-1], down[:, :-1], out=moved[:, :-1])
+		expand[:, 1:] |= moved[:, :-1]
+		np.bitwise_and(frontier[:, 1:], down[:, :-1], out=moved[:, :-1])
+		expand[:, :-1] |= moved[:, :-1]
+		# expand and not seen
+		np.bitwise_and(expand, ~seen, out=expand)
+		if not expand.any():
+			# nothing left to reach, the remaining mazes are unsolvable
+			break
+		seen |= expand
+		if with_dist:
+			set_distance(dist, live, expand, step)
+		frontier, expand = expand, frontier
+	if with_dist:
+		return lengths, dist
+	return lengths
+
+def paths(wall_array, dist):
+	'''
+	Walks back from the end of every maze to its start in lockstep.
+	@params
+		wall_array(ndarray)	: (N, height, width) array returned by walls
+		dist(ndarray)	: (N, height, width) array returned by distances
+	@return
+		[[(int, int)]]	: path of (x, y) positions from start to end per maze
+	'''
+	count, height, width = wall_array.shape
+	lengths = dist[:, -1, -1]
+	index = np.arange(count)
+	x = np.full(count, width-1)
+	y = np.full(count, height-1)
+	d = lengths.copy()
+	trail = np.zeros((count, max(int(lengths.max()), 0)+1, 2), dtype=np.int32)
+	trail[index, np.maximum(d, 0)] = np.stack((x, y), axis=1)
+	while (d > 0).any():
+		active = d > 0
+		prev = d - 1
+		# clip so out of bounds neighbors can be indexed, they are masked out
+		left = np.maximum(x-1, 0)
+		right = np.minimum(x+1, width-1)
+		up = np.maximum(y-1, 0)
+		down = np.minimum(y+1, height-1)
+		# since the maze is a tree only one neighbor is one move closer
+		go_left = (x > 0) & (wall_array[index, y, left] & OPEN_RIGHT != 0) & (dist[index, y, left] == prev)
+		go_right = (x < width-1) & (wall_array[index, y, x] & OPEN_RIGHT != 0) & (dist[index, y, right] == prev)
+		go_up = (y > 0) & (wall_array[index, up, x] & OPEN_DOWN != 0) & (dist[index, up, x] == prev)
+		go_down = (y < height-1) & (wall_array[index, y, x] & OPEN_DOWN != 0) & (dist[index, down, x] == prev)
+		x = np.where(active & go_left, left, np.where(active & go_right, right, x))
+		y = np.where(active & go_up, up, np.where(active & go_down, down, y))
+		d = np.where(active, prev, d)
+		trail[index[active], d[active]] = np.stack((x[active], y[active]), axis=1)
+	return [[tuple(p) for p in trail[i, :lengths[i]+1].tolist()] if lengths[i] >= 0 else []
+		for i in range(count)]
+
+def solve(mazes, with_paths=False):
+	'''
+	Solves every maze from (0,0) to (width-1, height-1).
+	@params
+		mazes([Maze])	: mazes which must all share the same width and height
+		with_paths(bool)	: also return the solution paths
+	@return
+		ndarray	: number of moves in each solution, -1 if unsolvable
+		[[(int, int)]]	: solution paths, only if with_paths is True
+	'''
+	wall_array = walls(mazes)
+	if with_paths:
+		lengths, dist = distances(wall_array)
+		return lengths, paths(wall_array, dist)
+	return distances(wall_array, with_dist=False)
@@ -7,7 +7,7 @@ algorithm to generate a randomized mazes!
 	@author: Paul Miller (github.com/138paulmiller)
 '''
 
-import os, sys, random, time, threading
+import os, sys, random, time, threading, array
 # defined in disjointSet.py
 import disjointSet as ds
 
@@ -41,6 +41,7 @@ class Maze:
 		self.time_taken = False
 		self.timer_thread = None
 		self.is_moving = True # used as a semaphore for the update time thread
+		self.screen = None # terminal.Terminal the maze is drawn on, if any
 		self.width = width
 		self.height = height
 		self.seed = seed
@@ -62,6 +63,10 @@ class Maze:
 				for col in range(0, width)]
 		# portals[key] = {keys of neighbors}
 		self.portals = {}
+		# every portal once as packed (a, b) uint32 pairs with a < b, 8 bytes
+		# per cell kept next to portals so exporting and batch solving never 
+		# have to walk the portal dicts
+		self.edge_array = array.array('I')
 		# generate the maze by using a kruskals algorithm 
 		self.kruskalize()	
 	
@@ -128,17 +133,40 @@ class Maze:
 		'''
 		Returns a string containing a list of all portal coordinates
 		'''
+		lines = ['Portal Coordinates\n']
 		i = 1
-		s = 'Portal Coordinates\n'
 		for key, portals in self.portals.items():
 			for near in portals.keys():
 		                        # print the cell ids
-				s += '%-015s' % (str((key, near)))
+				lines.append('%-015s' % (str((key, near))))
 				# draw 5 portals coordinates per line
 				if i % 5 == 0:
-					s+='\n'
+					lines.append('\n')
 				i+=1
-		return s
+		return ''.join(lines)
+
+	def edge_count(self):
+		'''
+		Number of undirected portals written by edge_chunks
+		'''
+		return len(self.edge_array)//2
+
+	def edge_chunks(self, chunk_size=4096):
+		'''
+		Packs the edges as little-endian uint32 pairs, chunk_size edges at a time.
+		The chunks are sliced from edge_array, which kruskalize fills as it adds
+		each portal, so every portal is written once with the smaller key first.
+		@params
+			chunk_size(int) : number of edges packed per chunk
+		@return
+			Generator of bytes : packed edges, 8 bytes per edge
+		'''
+		assert self.edge_array.itemsize == 4
+		for start in range(0, len(self.edge_array), chunk_size*2):
+			chunk = self.edge_array[start:start+chunk_size*2]
+			if sys.byteorder != 'little':
+				chunk.byteswap()
+			yield chunk.tobytes()
 
 	def init_symbols(self, symbols):
 		#get symbol colors _color + bg_color
@@ -240,6 +268,9 @@ class Maze:
 				edge_count+=1	
 				self.portals[key_a][key_b] = True 
 				self.portals[key_b][key_a] = True 
+				# edges are built from the left or down cell, so key_a < key_b
+				self.edge_array.append(key_a)
+				self.edge_array.append(key_b)
 				disjoint_set.union(set_a, set_b)
 
 	def move(self, direction):
@@ -251,51 +282,79 @@ class Maze:
 		@return
 			None
 		'''
+		self.is_moving = True
+		step = self.step(self.player, self.path, direction)
+		valid = False
+		if step != None:
+			self.player, valid, cells = step
+			# only draw if the maze is on screen
+			if self.screen != None:
+				for row, col, symbol in cells:
+					self.screen.draw(row, col, symbol)
+				self.screen.flush()
+		self.is_moving = False 
+		return valid
+
+	def step(self, player, path, direction):
+		'''
+		Moves from player towards direction without touching the maze state,
+		so many players can share the same maze
+		@params
+			player((int, int))	: position to move from
+			path([(int, int)])	: path taken to reach player, updated in place
+			direction((int, int)) : Direction to move player
+		@return
+			None if there is no portal, else (new player, valid, cells)
+			where valid is False if the move backtracked and cells is a 
+			list of (row, col, symbol) screen cells to redraw
+		'''
 		assert(direction in [self.LEFT, self.RIGHT, self.UP, self.DOWN])
 		# if new move is the same as last move pop from path onto player 
-		new_move = (self.player[0]+direction[0],\
-					self.player[1]+direction[1]) 
-		valid = False
+		new_move = (player[0]+direction[0],\
+					player[1]+direction[1]) 
 		# if new move is not within grid
 		if new_move[0] < 0 or new_move[0] >= self.width or\
 			new_move[1] < 0 or new_move[1] >= self.height:
-			return valid
-		player_key = self.width*self.player[1] + self.player[0]		
+			return None
+		player_key = self.width*player[1] + player[0]		
 		move_key = self.width*new_move[1] + new_move[0]	
- 		#if theres a portal between player and newmove
-		if move_key in self.portals[player_key]:
-			self.is_moving = True
-			#'\033[%d;%dH' % (y x)# move cursor to y, x
-			head = '\033[%d;%dH' % (new_move[1]*2+2, new_move[0]*2+2)  + self.head
-			# uncolor edge between (edge is between newmove and player)
-			edge = '\033[%d;%dH' %  (self.player[1]*2+(new_move[1]-self.player[1])+2,\
-									self.player[0]*2+(new_move[0]-self.player[0])+2)
-			tail = '\033[%d;%dH' % (self.player[1]*2+2, self.player[0]*2+2) 
-			end = '\033[%d;%dH' % ((self.height)*2+2, 0) +self.empty
-			# if new move is backtracking to last move then sets player pos to top of path and remove path top
-			if len(self.path) > 0 and new_move == self.path[-1]:
-				# move cursor to player and color tail, move cursor to player and color empty
-				self.player = self.path.pop()
-				# move cursor to player and color tail, move cursor to player and color empty
-				# uncolor edge between and remove tail
-				edge += self.empty
-				tail += self.empty
-				valid = False # moved back
-			# else move progresses path, draws forward and adds move to path
-			else:
-				self.path.append(self.player)
-				self.player = new_move
-				#move cursor to position to draw if ANSI
-				# color edge between and color tail
-				edge += self.tail
-				tail += self.tail					
-				valid = True # successfully moved forward between portals
+ 		#if theres no portal between player and newmove
+		if move_key not in self.portals[player_key]:
+			return None
+		head = self.cell_pos(new_move)
+		tail = self.cell_pos(player)
+		# edge is the wall slot between newmove and player
+		edge = (tail[0]+direction[1], tail[1]+direction[0])
+		# if new move is backtracking to last move then sets player pos to top of path and remove path top
+		if len(path) > 0 and new_move == path[-1]:
+			player = path.pop()
+			# uncolor edge between and remove tail
+			symbol = self.empty
+			valid = False # moved back
+		# else move progresses path, draws forward and adds move to path
+		else:
+			path.append(player)
+			player = new_move
+			# color edge between and color tail
+			symbol = self.tail
+			valid = True # successfully moved forward between portals
+		return (player, valid, [head + (self.head,), edge + (symbol,), tail + (symbol,)])
 
-			# use write and flush to ensure buffer is emptied completely to avoid flicker
-			sys.stdout.write(head+edge+tail+end)
-			sys.stdout.flush()
-			self.is_moving = False 
-		return valid
+	def cell_pos(self, position):
+		'''
+		Screen position of a cell as drawn by to_str, each cell is surrounded by walls
+		@params
+			position((int, int))	: (x, y) cell coordinates
+		@return
+			(int, int)	: 0 based (row, col) on screen
+		'''
+		return (position[1]*2+1, position[0]*2+1)
+
+	def status_row(self):
+		'''
+		Screen row below the maze used to print the time
+		'''
+		return self.height*2+1
 	
 
 
@@ -372,9 +431,9 @@ class Maze:
 				# delay on the update rate (only update every 10th of a second)
 				if time_elapsed -self.time_taken > 0.01: 
 					self.time_taken = time_elapsed 
-					# use write and flush to ensure buffer is emptied completely to avoid flicker
-					sys.stdout.write('\033[%d;%dHTime:%.2f' % (self.height*2+2, 0, self.time_taken))
-					sys.stdout.flush()
+					if self.screen != None:
+						self.screen.draw(self.status_row(), 0, 'Time:%.2f' % self.time_taken)
+						self.screen.flush()
 			
 		self.time_taken = time.time() - start_time
 
@@ -0,0 +1,206 @@
+#! /usr/bin/env python3
+'''
+Maze Server that lets many players play the same maze at once.
+Each telnet connection gets its own Session with its own player position,
+path, timer and output buffer, while the Maze itself is shared and never
+modified by the sessions.
+	telnet localhost PORT
+@author: Paul Miller (github.com/138paulmiller)
+'''
+import asyncio, sys, time
+from maze import Maze
+import terminal
+
+# telnet commands
+IAC = 255
+DONT, DO, WONT, WILL = 254, 253, 252, 251
+SB, SE = 250, 240
+ECHO = 1
+SUPPRESS_GO_AHEAD = 3
+# ask the client to send each key as it is pressed and not echo it
+CHAR_MODE = bytes([IAC, WILL, ECHO, IAC, WILL, SUPPRESS_GO_AHEAD, IAC, DO, SUPPRESS_GO_AHEAD])
+# longest unfinished command kept between reads
+MAX_PENDING = 1024
+
+# same controls as pymaze.play_maze
+QUIT_KEY = 'x'
+DIRECTIONS = {
+	'w' : Maze.UP, 'A' : Maze.UP,
+	's' : Maze.DOWN, 'B' : Maze.DOWN,
+	'd' : Maze.RIGHT, 'C' : Maze.RIGHT,
+	'a' : Maze.LEFT, 'D' : Maze.LEFT,
+}
+
+def strip_telnet(data):
+	'''
+	Removes telnet command sequences from the bytes read from a client.
+	A command cut off at the end of data is returned separately so it can
+	be completed by the next read.
+	@params
+		data(bytes) : raw bytes read from the client
+	@return
+		bytes : only the keys the player typed
+		bytes : unfinished command at the end of data, empty if none
+	'''
+	keys = bytearray()
+	i = 0
+	while i < len(data):
+		byte = data[i]
+		if byte != IAC:
+			keys.append(byte)
+			i+=1
+		elif i+1 >= len(data):
+			# IAC is the last byte
+			break
+		elif data[i+1] == IAC:
+			# escaped 255 data byte
+			keys.append(IAC)
+			i+=2
+		elif data[i+1] in [DONT, DO, WONT, WILL]:
+			# option negotiation is 3 bytes
+			if i+2 >= len(data):
+				break
+			i+=3
+		elif data[i+1] == SB:
+			# skip subnegotiation up to IAC SE
+			end = data.find(bytes([IAC, SE]), i+2)
+			if end < 0:
+				break
+			i = end+2
+		else:
+			i+=2
+	return bytes(keys), data[i:]
+
+class Session:
+	'''
+	Session : state of a single connected player
+	'''
+	def __init__(self, maze_obj, reader, writer):
+		self.maze = maze_obj
+		self.reader = reader
+		self.writer = writer
+		self.player = (0,0) # players position
+		self.path = [] # current path taken
+		self.start_time = None
+		self.time_taken = 0
+		self.out = [] # output buffer, sent on flush
+		self.pending = b'' # telnet command split across reads
+		self.screen = terminal.Terminal() # shadow screen of the client
+
+	def write(self, s):
+		self.out.append(s)
+
+	def draw(self):
+		'''
+		Adds the cells that changed on the clients screen to the output buffer
+		'''
+		self.write(self.screen.render())
+
+	async def flush(self):
+		'''
+		Sends the whole output buffer in a single write
+		'''
+		if len(self.out) == 0:
+			return
+		# telnet expects CRLF line endings
+		data = ''.join(self.out).replace('\n', '\r\n')
+		self.out = []
+		self.writer.write(data.encode('utf-8'))
+		await self.writer.drain()
+
+	def move(self, direction):
+		step = self.maze.step(self.player, self.path, direction)
+		if step != None:
+			self.player, valid, cells = step
+			for row, col, symbol in cells:
+				self.screen.draw(row, col, symbol)
+
+	def is_done(self):
+		return self.player == (self.maze.width-1, self.maze.height-1)
+
+	async def timer_job(self):
+		# prints the sessions time at the bottom of the maze
+		while not self.is_done():
+			self.time_taken = time.time() - self.start_time
+			self.screen.draw(self.maze.status_row(), 0, 'Time:%.2f' % self.time_taken)
+			self.draw()
+			await self.flush()
+			# only update every 10th of a second
+			await asyncio.sleep(0.1)
+
+	async def play(self):
+		'''
+		Runs the game loop until the player solves the maze, quits or disconnects
+		'''
+		self.writer.write(CHAR_MODE)
+		self.screen.clear()
+		self.screen.draw(0, 0, self.maze.to_str())
+		self.draw()
+		await self.flush()
+		self.start_time = time.time()
+		timer = asyncio.ensure_future(self.timer_job())
+		quit = False
+		try:
+			while not quit and not self.is_done():
+				data = await self.reader.read(64)
+				if not data:
+					return
+				keys, self.pending = strip_telnet(self.pending + data)
+				if len(self.pending) > MAX_PENDING:
+					# never closed subnegotiation, drop it
+					self.pending = b''
+				for key in keys.decode('latin1'):
+					if key == QUIT_KEY:
+						quit = True
+						break
+					if key in DIRECTIONS:
+						self.move(DIRECTIONS[key])
+						if self.is_done():
+							break
+				self.draw()
+				await self.flush()
+			self.time_taken = time.time() - self.start_time
+			if quit:
+				self.write('\nBetter Luck next time\n')
+			else:
+				self.write('\nSolved in %f seconds!\n' % self.time_taken)
+			self.write('Thanks for Playing!\n')
+			await self.flush()
+		finally:
+			timer.cancel()
+
+async def handle(maze_obj, reader, writer):
+	session = Session(maze_obj, reader, writer)
+	try:
+		await session.play()
+	except ConnectionError:
+		pass
+	finally:
+		writer.close()
+
+async def run(maze_obj, port, host):
+	server = await asyncio.start_server(
+		lambda reader, writer: handle(maze_obj, reader, writer), host, port)
+	print('Serving %dx%d maze on %s:%d' % (maze_obj.width, maze_obj.height, host, port))
+	print('Connect with: telnet %s %d' % (host, port))
+	async with server:
+		await server.serve_forever()
+
+def serve(maze_obj, port, host='127.0.0.1'):
+	'''
+	Serves the maze to every player that connects until interrupted.
+	@params
+		maze_obj(Maze)	: maze shared by all sessions
+		port(int)	: TCP port to listen on
+		host(str)	: address to bind, localhost by default
+	@return
+		None
+	'''
+	try:
+		asyncio.run(run(maze_obj, port, host))
+	except KeyboardInterrupt:
+		pass
+	except OSError as e:
+		# port in use or not allowed
+		print('Error: Could not serve on %s:%d: %s' % (host, port, e.strerror or e))
+		sys.exit(-1)
@@ -5,8 +5,9 @@ PyMaze driver class. Makes use of the maze class to parse program arguments.
 @author: Paul Miller (github.com/138paulmiller)
 '''
 
-import os, sys, random, time, threading
-import maze
+import os, sys, random, time, threading, gzip, zlib
+import multiprocessing
+import maze, terminal
 
 # defalt ANSI settings from user
 COLOR_DEFAULT = u'\u001b[0m'
@@ -53,29 +54,62 @@ def getchar():
 		char = msvcrt.getch()
 	return char
 
-def save_maze(maze, out_filename):	  
+def save_maze(maze, out_filename, edge_format=None, compress=None):	  
 	#write the maze to a text file
 	out_file = open(out_filename+'_maze.txt', 'w')	
 	out_file.write(maze.to_str())
 	out_file.close()
 
+	if edge_format != None:
+		# write the packed edge list instead of the portals text
+		save_edges(maze, out_filename, edge_format, compress)
+		return
 	# write the portals to a textfile
 	out_file= open(out_filename +'_portals.txt', 'w')
 	out_file.write( maze.portals_str())
 	out_file.close()
 
+def npy_header(rows):
+	'''
+	Builds a version 1.0 .npy header for a (rows, 2) little-endian uint32 array
+	so the edges can be streamed without loading numpy
+	'''
+	header = "{'descr': '<u4', 'fortran_order': False, 'shape': (%d, 2), }" % rows
+	# magic(6) + version(2) + header length(2) + header must align to 64 bytes
+	pad = 64 - (10 + len(header) + 1) % 64
+	header += ' '*(pad % 64) + '\n'
+	return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1')
 
-	
-def play_maze(maze_obj):
-	quit_key = lambda key: key == ord('x')
-	up_key = lambda key: key == ord('w') or key == ord('A')
-	down_key = lambda key: key == ord('s') or key == ord('B')
-	right_key = lambda key: key == ord('d') or key == ord('C')
-	left_key = lambda key: key == ord('a') or  key == ord('D')
+def save_edges(maze, out_filename, edge_format, compress=None):
+	'''
+	Streams each undirected portal once as a packed uint32 pair
+	@params
+		edge_format(str)	: 'bin' for raw pairs or 'npy' for a numpy array file
+		compress(str)	: None, 'gzip' or 'zlib'
+	'''
+	filename = out_filename + '_edges.' + edge_format
+	if compress == 'gzip':
+		out_file = gzip.open(filename + '.gz', 'wb')
+		write = out_file.write
+	elif compress == 'zlib':
+		out_file = open(filename + '.zlib', 'wb')
+		compressor = zlib.compressobj()
+		write = lambda data: out_file.write(compressor.compress(data))
+	else:
+		out_file = open(filename, 'wb')
+		write = out_file.write
+	if edge_format == 'npy':
+		write(npy_header(maze.edge_count()))
+	for chunk in maze.edge_chunks():
+		write(chunk)
+	if compress == 'zlib':
+		out_file.write(compressor.flush())
+	out_file.close()
 
-	#clear the screen clear if linux, cls if windows
-	os.system('clear' if os.name!='nt' else 'cls')	
-	print(r'''
+	
+def show_banner(screen):
+	screen.clear()
+	screen.draw(0, 0, r'''
 #######  ##    ## ##	 ##    ###    ########	######## 
 ##    ##  ##  ##  ###	###   ## ##	   ##	##	 
 ##    ##   ####   #### ####  ##   ##	  ##	######	     
@@ -88,9 +122,24 @@ Controls:
 
 Press any key to start!
 	''')
-	getchar()
-	os.system('clear' if os.name!='nt' else 'cls')	
-	print(maze_obj.to_str())
+	screen.flush()
+
+def play_level(maze_obj, screen):
+	'''
+	Plays a single maze on the screen until it is solved or the player gives up
+	@return
+		float	: seconds taken to solve, None if the player gave up
+	'''
+	quit_key = lambda key: key == ord('x')
+	up_key = lambda key: key == ord('w') or key == ord('A')
+	down_key = lambda key: key == ord('s') or key == ord('B')
+	right_key = lambda key: key == ord('d') or key == ord('C')
+	left_key = lambda key: key == ord('a') or  key == ord('D')
+
+	screen.clear()
+	screen.draw(0, 0, maze_obj.to_str())
+	screen.flush()
+	maze_obj.screen = screen
 	maze_obj.start_timer()	
 	move = 0
 	# exit when either ESC or q are entered
@@ -111,15 +160,83 @@ Press any key to start!
 	# kil timer or show time 
 	if quit_key(move):
 		maze_obj.kill_timer()
-		print('\nBetter Luck next time')
-	else:
-		print('Solved in %f seconds!' % maze_obj.end_timer())
+		return None
+	return maze_obj.end_timer()
+
+def play_maze(maze_obj):
+	# the terminal switches to the alternate screen and clears it
+	with terminal.Terminal() as screen:
+		show_banner(screen)
+		getchar()
+		time_taken = play_level(maze_obj, screen)
+		if time_taken == None:
+			message = '\nBetter Luck next time'
+		else:
+			message = 'Solved in %f seconds!' % time_taken
+		# keep the maze on screen until a key is pressed
+		screen.draw(maze_obj.status_row()+1, 0, message + '\nPress any key to exit')
+		screen.flush()
+		getchar()
+		maze_obj.screen = None
+	print(message)
+	print('Thanks for Playing!');
+
+def generate_maze(width, height, seed, symbols):
+	# runs in the prefetch worker process, returns the maze and seconds spent generating it
+	start_time = time.time()
+	maze_obj = maze.Maze(width, height, seed, symbols)
+	return maze_obj, time.time() - start_time
+
+def play_continuous(width, height, seed, symbols, grow):
+	'''
+	Plays level after level. While a level is played the next maze, with the 
+	next seed and grow more columns and rows, is generated in a worker process
+	so it is ready as soon as the current level is solved.
+	'''
+	pool = multiprocessing.Pool(1)
+	level = 1
+	solved = 0
+	try:
+		with terminal.Terminal() as screen:
+			show_banner(screen)
+			next_maze = pool.apply_async(generate_maze, (width, height, seed, symbols))
+			getchar()
+			# the first level has nothing to overlap with, so wait for it
+			maze_obj, gen_time = next_maze.get()
+			while True:
+				# prefetch the next level while this one is played
+				next_maze = pool.apply_async(generate_maze, \
+					(width+grow*level, height+grow*level, seed+level, symbols))
+				time_taken = play_level(maze_obj, screen)
+				if time_taken == None:
+					break
+				solved+=1
+				start_time = time.time()
+				next_obj, next_gen_time = next_maze.get()
+				handoff_time = time.time() - start_time
+				# keep the maze on screen with the level summary
+				screen.draw(maze_obj.status_row()+1, 0, 
+					'Level %d solved in %f seconds!\n' % (level, time_taken) +
+					'Level %d %dx%d maze generated in %f seconds, handed off in %f seconds\n' % \
+						(level+1, next_obj.width, next_obj.height, next_gen_time, handoff_time) +
+					'Press any key for the next level or x to quit')
+				screen.flush()
+				maze_obj.screen = None
+				if getchar() in ['x', b'x']:
+					break
+				maze_obj = next_obj
+				level+=1
+			maze_obj.screen = None
+	finally:
+		# kill the worker, it may still be generating a level that will never be played
+		pool.terminate()
+		pool.join()
+	print('Solved %d level%s' % (solved, '' if solved == 1 else 's'))
 	print('Thanks for Playing!');
 		
 def solve_maze(maze_obj):
 	# print('Press any key to see solution!')
 	# getchar();
-	# os.system('clear' if os.name!='nt' else 'cls')
 	# print(maze_obj.to_str())
 	# maze_obj.start_timer()
 	# maze_obj.solve()	
@@ -129,11 +246,34 @@ def solve_maze(maze_obj):
 
 	print('Press any key to see heuristic solution!')
 	getchar();
-	os.system('clear' if os.name!='nt' else 'cls')
-	print(maze_obj.to_str())
-	maze_obj.start_timer()
-	maze_obj.heuristic_solve()	
-	print('Solved in %f seconds!' % maze_obj.end_timer()+'\n')
+	with terminal.Terminal() as screen:
+		screen.draw(0, 0, maze_obj.to_str())
+		screen.flush()
+		maze_obj.screen = screen
+		maze_obj.start_timer()
+		maze_obj.heuristic_solve()	
+		message = 'Solved in %f seconds!' % maze_obj.end_timer()
+		# keep the solution on screen until a key is pressed
+		screen.draw(maze_obj.status_row()+1, 0, message + '\nPress any key to exit')
+		screen.flush()
+		getchar()
+		maze_obj.screen = None
+	print(message+'\n')
+
+def batch_solve(width, height, seed, count, symbols):
+	# numpy is only needed for batch solving
+	import batchSolver
+	start_time = time.time()
+	mazes = [maze.Maze(width, height, seed+i, symbols) for i in range(count)]
+	gen_time = time.time() - start_time
+	start_time = time.time()
+	lengths = batchSolver.solve(mazes)
+	solve_time = time.time() - start_time
+	print('Generated %d %dx%d mazes in %f seconds' % (count, width, height, gen_time))
+	print('Solved %d mazes in %f seconds (%.1f mazes/second)' % \
+		(count, solve_time, count/solve_time if solve_time > 0 else float('inf')))
+	print('Solution length min %d, mean %.2f, max %d' % \
+		(lengths.min(), lengths.mean(), lengths.max()))
 
 def error(msg):
 	print(msg+'\nTry \'./maze -help\' for information\n')
@@ -160,10 +300,16 @@ Options:
 	-height ROW	Sets the maze height (number of rows) to ROW (Must be greater than 0). Default is 12
 	-seed SEED	Sets Random Number Generator's seed to SEED.  Default seed is random
 	-out NAME	Sets output file prefix to NAME, default is seed number		
+	-edges FORMAT	Saves the portals as packed uint32 pairs, FORMAT is bin or npy, instead of the portals text, only works with output mode
+	-compress METHOD	Compresses the edges file, METHOD is gzip or zlib, only works with -edges
 	-interactive	Starts CLI maze game. Does not save to file	
 	-block	Print maze using Unicode block characters, only works with interactive mode	
 	-color	Print maze using ANSI style coloring, only works with interactive mode	
 	-solve	Displays the solution to the maze in real-time, only works with interactive mode
+	-continuous	Starts the maze game level after level, the next maze is generated in the background while playing
+	-grow STEP	Adds STEP columns and rows to each new level, only works with continuous mode. Default is 0
+	-serve PORT	Hosts the maze for many players over telnet on localhost:PORT
+	-batch COUNT	Generates COUNT mazes seeded SEED, SEED+1, ... and solves them all at once, reports mazes solved per second (requires numpy)
 	-help	Prints this menu
 Example:
 	The following generates two files, MyMaze_maze.txt and MyMaze_portals.txt, which contain a 50x45 maze with a random seed of 13.1 
@@ -215,6 +361,12 @@ Example:
 	is_block= False
 	is_solve = False
 	out_filename = None # default file names is in mazes dir and seed used
+	edge_format = None # None writes the portals text file
+	batch_count = 0
+	serve_port = None
+	is_continuous = False
+	grow = 0
+	compress = None
 	#parse arguments not including script path
 	i = 1	
 	while i < argc:
@@ -240,6 +392,16 @@ Example:
 			out_filename = parse_arg('-out', argv, i, str)
 			output_to_file = True
 			i+=1 # eat next arg
+		elif option == '-edges':
+			edge_format = parse_arg('-edges', argv, i, str)
+			if edge_format not in ['bin', 'npy']:
+				error('Invalid argument: edges format must be bin or npy')
+			i+=1 # eat next arg
+		elif option == '-compress':
+			compress = parse_arg('-compress', argv, i, str)
+			if compress not in ['gzip', 'zlib']:
+				error('Invalid argument: compress method must be gzip or zlib')
+			i+=1 # eat next arg
 		elif option == '-interactive':
 			interactive = True
 		elif option == '-block':
@@ -252,16 +414,56 @@ Example:
 
 			interactive = True
 			is_solve = True
+		elif option == '-continuous':
+			interactive = True
+			is_continuous = True
+		elif option == '-grow':
+			grow = parse_arg('-grow', argv, i, int)
+			if grow < 0:
+				error('Invalid argument: grow must be a non-negative integer')
+			i+=1 # eat next arg
+		elif option == '-serve':
+			serve_port = parse_arg('-serve', argv, i, int)
+			if serve_port <= 0 or serve_port > 65535:
+				error('Invalid argument: port must be between 1 and 65535')
+			i+=1 # eat next arg
+		elif option == '-batch':
+			batch_count = parse_arg('-batch', argv, i, int)
+			if batch_count <= 0:
+				error('Invalid argument: batch count must be a positive integer')
+			i+=1 # eat next arg
 		elif option == '-help':
 			print(usage)
 			sys.exit(-1)		
 		else:
 			error('Invalid option: ' + option )	
 			
+	if compress != None and edge_format == None:
+		error('Error: Compression only works with -edges')
+	if edge_format != None and not output_to_file:
+		error('Error: Edge export only works with output mode')
+	if grow != 0 and not is_continuous:
+		error('Error: -grow only works with continuous mode')
+	if batch_count > 0:
+		if interactive or output_to_file:
+			error('Error: Batch mode is NOT compatible with interactive or output mode')
+		batch_solve(width, height, seed, batch_count, symbols)
+		return
+	if is_continuous:
+		if output_to_file or is_solve or serve_port != None:
+			error('Error: Continuous mode is NOT compatible with output, solve or serve mode')
+		# mazes are generated by the prefetch worker
+		play_continuous(width, height, seed, symbols, grow)
+		return
 	#create the maze
 	maze_obj = maze.Maze(width, height, seed, symbols)
 	# activate a repl-like command interpreter to try to solve the maze 
-	if interactive:
+	if serve_port != None:
+		if interactive or output_to_file:
+			error('Error: Serve mode is NOT compatible with interactive or output mode')
+		import mazeServer
+		mazeServer.serve(maze_obj, serve_port)
+	elif interactive:
 		if output_to_file:		
 			error('Error: Output mode NOT compatible with interactive mode')	
 		if is_solve:
@@ -278,12 +480,12 @@ Example:
 			elif is_solve:		
 				error('Error: Solution is NOT compatible with output mode')
 			else:
-				save_maze(maze_obj, out_filename)
+				save_maze(maze_obj, out_filename, edge_format, compress)
 		else:
 			if is_solve:		
 				error('Error: Solution must be invoke in interactive mode')
 			# print to standard output
-			os.system('clear' if os.name!='nt' else 'cls')	
+			sys.stdout.write(terminal.CLEAR)
 			print(maze_obj.to_str())
 
 # After all definitions, start main
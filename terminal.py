@@ -0,0 +1,212 @@
+#! /usr/bin/env python3
+'''
+Terminal Class that owns all drawing to an ANSI terminal.
+Keeps a shadow copy of the screen so only the cells that changed since the
+last flush are written, and uses escape codes instead of forking a shell
+to clear the screen.
+@author: Paul Miller (github.com/138paulmiller)
+'''
+import sys, re, signal, threading
+
+ALT_SCREEN_ON = '\033[?1049h'
+ALT_SCREEN_OFF = '\033[?1049l'
+CLEAR = '\033[2J\033[H'
+HIDE_CURSOR = '\033[?25l'
+SHOW_CURSOR = '\033[?25h'
+RESET = '\033[0m'
+
+# matches any CSI escape sequence, only SGR (ending in m) changes the cell style
+ESCAPE = re.compile(r'\033\[([0-9;?]*)([A-Za-z])')
+
+def cursor(row, col):
+	'''
+	Escape code that moves the cursor to the 0 based row and col
+	'''
+	return '\033[%d;%dH' % (row+1, col+1)
+
+def apply_sgr(style, params):
+	'''
+	Applies SGR parameters to a style so repeated color codes do not pile up.
+	@params
+		style((str, str, str))	: (foreground, background, attributes) codes
+		params(str)	: parameters of the SGR escape, e.g. '0' or '1;34'
+	@return
+		(str, str, str)	: the new style
+	'''
+	fg, bg, attrs = style
+	for param in (params or '0').split(';'):
+		code = int(param) if param.isdigit() else 0
+		if code == 0:
+			fg, bg, attrs = '', '', ''
+		elif 30 <= code <= 39 or 90 <= code <= 97:
+			fg = '\033[%dm' % code
+		elif 40 <= code <= 49 or 100 <= code <= 107:
+			bg = '\033[%dm' % code
+		else:
+			attrs += '\033[%dm' % code
+	return (fg, bg, attrs)
+
+class Terminal:
+	'''
+	Terminal : buffered, diff based screen writer
+		Cells are drawn into a shadow screen and flush only writes cells
+		that differ from what is already shown
+	'''
+	def __init__(self, out=None):
+		'''
+		@params
+			out(file)	: stream written to on flush, stdout by default
+		'''
+		self.out = out if out != None else sys.stdout
+		self.lock = threading.RLock() # timer thread and input loop both draw
+		self.busy = False # set while drawing or flushing
+		self.cells = {} # (row, col) : (style, char) wanted on screen
+		self.shown = {} # (row, col) : (style, char) currently on screen
+		self.dirty = set() # cells drawn since the last flush
+		self.pending = '' # escape codes to send before the next cells
+		self.style = None # style of the last cell written, None if unknown
+		self.rows = 0 # number of rows drawn, cursor is parked below them
+		self.resized = False
+		self.old_winch = None
+
+	def __enter__(self):
+		'''
+		Switches to the alternate screen buffer and redraws on window resize
+		'''
+		self.out.write(ALT_SCREEN_ON + HIDE_CURSOR)
+		self.clear()
+		self.flush()
+		# windows has no SIGWINCH
+		if hasattr(signal, 'SIGWINCH') and threading.current_thread() is threading.main_thread():
+			self.old_winch = signal.signal(signal.SIGWINCH, lambda signum, frame: self.resize())
+		return self
+
+	def __exit__(self, *exc):
+		if self.old_winch != None:
+			signal.signal(signal.SIGWINCH, self.old_winch)
+			self.old_winch = None
+		self.out.write(RESET + SHOW_CURSOR + ALT_SCREEN_OFF)
+		self.out.flush()
+		return False
+
+	def clear(self):
+		'''
+		Blanks the screen, takes effect on the next flush
+		'''
+		with self.lock:
+			self.cells = {}
+			self.shown = {}
+			self.dirty = set()
+			self.pending = CLEAR
+			self.style = None
+			self.rows = 0
+
+	def resize(self):
+		'''
+		Repaints the whole screen, the terminal may have reflowed it.
+		Called from the SIGWINCH handler, so if a draw or flush is already 
+		running the repaint is left to the next flush.
+		'''
+		self.resized = True
+		if not self.busy:
+			self.flush()
+
+	def draw(self, row, col, text):
+		'''
+		Draws text into the shadow screen starting at row and col.
+		Newlines start the next row at col, ANSI colors are kept per cell.
+		@params
+			row(int)	: 0 based row
+			col(int)	: 0 based column
+			text(str)	: text that may contain ANSI color codes
+		@return
+			None
+		'''
+		with self.lock:
+			self.busy = True
+			try:
+				self.draw_text(row, col, text)
+			finally:
+				self.busy = False
+
+	def draw_text(self, row, col, text):
+		style = ('', '', '')
+		start = col
+		i = 0
+		while i < len(text):
+			char = text[i]
+			match = ESCAPE.match(text, i) if char == '\033' else None
+			if match != None:
+				if match.group(2) == 'm':
+					style = apply_sgr(style, match.group(1))
+				i = match.end()
+				continue
+			i+=1
+			if char == '\n':
+				row+=1
+				col = start
+				continue
+			if char == '\r':
+				continue
+			if char == '\t':
+				# expand tabs to the next multiple of 8 columns
+				for _ in range(8 - col % 8):
+					self.set_cell(row, col, style, ' ')
+					col+=1
+				continue
+			self.set_cell(row, col, style, char)
+			col+=1
+
+	def set_cell(self, row, col, style, char):
+		self.cells[(row, col)] = (style, char)
+		self.dirty.add((row, col))
+		self.rows = max(self.rows, row+1)
+
+	def render(self):
+		'''
+		Returns the escape codes that bring the terminal up to date with the
+		shadow screen without writing them
+		'''
+		with self.lock:
+			if self.resized:
+				self.resized = False
+				self.pending = CLEAR
+				self.shown = {}
+				self.style = None
+				self.dirty = set(self.cells.keys())
+			s = [self.pending]
+			self.pending = ''
+			position = None
+			for key in sorted(self.dirty):
+				cell = self.cells[key]
+				if self.shown.get(key) == cell:
+					continue
+				self.shown[key] = cell
+				# only move the cursor if not already after the last cell
+				if position != key:
+					s.append(cursor(key[0], key[1]))
+				style = cell[0]
+				if style != self.style:
+					s.append(RESET + ''.join(style))
+					self.style = style
+				s.append(cell[1])
+				position = (key[0], key[1]+1)
+			self.dirty = set()
+			if position != None:
+				# park the cursor below everything drawn
+				s.append(cursor(self.rows, 0))
+			return ''.join(s)
+
+	def flush(self):
+		'''
+		Writes all changed cells in a single write
+		'''
+		with self.lock:
+			self.busy = True
+			try:
+				s = self.render()
+				if len(s) > 0:
+					self.out.write(s)
+					self.out.flush()
+			finally:
+				self.busy = False